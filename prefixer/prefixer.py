@@ -1,9 +1,20 @@
+import hashlib
 import json
+import os
 import sys
 
+# The dictionary loader is shared with word_game
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                "..", "word_game"))
+from dict_loader import load_words
+
 """
 The purpose of this program is to generate new English words by switching 
 	prefixes with their opposites (e.g. prepare -> postpare).
+
+With --sweep, it instead tries out many candidate lists of pairs (from a
+	json file) in one pass over the dictionary, and prints a table of how
+	well each pair did in each list.
 """
 
 pairs = (
@@ -46,31 +57,25 @@ pairs = (
 
 prefixes = [x for y in pairs for x in y]
 
-def load_words():
-    try:
-        with open(sys.argv[1]) as word_file:
-            words = json.load(word_file)
-            return words
-    except: 
-        print("Error: could not open file '{}'.".format(sys.argv[1]))
-
+# Per-pair results are cached here, keyed by the dictionary contents and pair
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "prefixer")
+# Bump whenever what a shard holds changes, so old shards aren't reused. 2:
+#   positions are in sorted, normalized word order, not the raw file order
+SHARD_FORMAT = "2"
 
 def main():
+    if len(sys.argv) == 4 and sys.argv[2] == "--sweep":
+        sweep(sys.argv[1], sys.argv[3])
+        return
     if len(sys.argv) != 2:
-        print("Usage: python3 prefixer.py <json_dict>")
+        print("Usage: python3 prefixer.py <json_dict> [--sweep <pairs_json>]")
         return
 
-    # get list of english words
-    allwords = load_words()
-
     # get list of english words with one of the listed prefixes,
     #   store in sets of (word, prefix)
     print("getting list of applicable words")
-    words = dict()
-    for w in allwords:
-        for p in prefixes:
-            if w.startswith(p) and not w == p:
-                words[w] = p
+    shards = get_shards(sys.argv[1], pairs)
+    words = merge_shards(shards)
 
     # swap the prefix
     print("swapping prefixes")
@@ -94,6 +99,155 @@ def main():
     print("DONE!")
 
 
+def sweep(dict_file, sweep_file):
+    # evaluate every list of pairs in sweep_file, scanning the dictionary
+    #   only once for all of them, and print how each pair did
+    try:
+        with open(sweep_file) as f:
+            configs = json.load(f)
+    except IOError:
+        sys.exit("Error: could not open file '{}'.".format(sweep_file))
+    except ValueError:
+        configs = None
+    if isinstance(configs, list):
+        configs = {str(i+1): c for i, c in enumerate(configs)}
+    try:
+        configs = {name: tuple((a, b) for a, b in c)
+                   for name, c in configs.items()}
+        if not all(isinstance(p, str) and p for c in configs.values()
+                   for pair in c for p in pair):
+            raise ValueError
+    except (AttributeError, TypeError, ValueError):
+        sys.exit("Error: '{}' should hold lists of prefix pairs, "
+                 "e.g. [[[\"pre\", \"post\"], [\"bi\", \"tri\"]]]."\
+                    .format(sweep_file))
+
+    # every distinct pair across all of the lists, in one scan
+    all_pairs = list(dict.fromkeys(p for c in configs.values() for p in c))
+    shards = get_shards(dict_file, all_pairs)
+
+    row = "{:<12} {:<18} {:>8} {:>10} {:>11}"
+    print(row.format("list", "pair", "matches", "new words", "collisions"))
+    for name, pair_list in configs.items():
+        words = merge_shards(shards, pair_list)
+        results = evaluate(words, pair_list)
+        totals = [0, 0, 0]
+        for pair in pair_list:
+            counts = results[pair]
+            totals = [t + c for t, c in zip(totals, counts)]
+            print(row.format(name, "{},{}".format(*pair), *counts))
+        print(row.format(name, "(total)", *totals))
+
+
+def evaluate(words, pair_list):
+    # for the {word: prefix} map of a list of pairs, count per pair how many
+    #   words it matched, how many swaps made new (non-)words and how many
+    #   collided with real words
+    pair_of = dict()
+    for pair in reversed(pair_list):
+        for p in pair:
+            pair_of[p] = pair   # first pair listed wins, like findpair
+
+    results = {pair: [0, 0, 0] for pair in pair_list}
+    for w, p in words.items():
+        pair = pair_of[p]
+        counts = results[pair]
+        counts[0] += 1
+        if swapprefix(w, pair) in words:
+            counts[2] += 1
+        else:
+            counts[1] += 1
+    return results
+
+
+def get_shards(dict_file, pair_list):
+    # get the prefix matches for each pair, only scanning the dictionary for
+    #   pairs that aren't already cached for this dictionary
+    digest = dict_digest(dict_file)
+    shards = dict()
+    for pair in pair_list:
+        shard = load_shard(digest, pair)
+        if shard is not None:
+            shards[pair] = shard
+
+    missing = [pair for pair in pair_list if pair not in shards]
+    print("reusing {} cached pairs, scanning for {}"\
+            .format(len(shards), len(missing)))
+    if missing:
+        # get list of english words
+        allwords = load_words(dict_file)
+        for pair, shard in scan_pairs(allwords, missing).items():
+            save_shard(digest, pair, shard)
+            shards[pair] = shard
+    return shards
+
+
+def dict_digest(filename):
+    # hash the dictionary file contents so cached results follow the words,
+    #   not the file name
+    h = hashlib.sha256()
+    try:
+        with open(filename, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+    except IOError:
+        sys.exit("Error: could not open file '{}'.".format(filename))
+    return h.hexdigest()
+
+
+def shard_path(digest, pair):
+    # cache file for one pair's results on the dictionary with the given hash
+    key = "\0".join((SHARD_FORMAT, digest) + pair).encode()
+    return os.path.join(CACHE_DIR, hashlib.sha256(key).hexdigest() + ".json")
+
+
+def load_shard(digest, pair):
+    # return the cached results for this pair, or None if there aren't any
+    try:
+        with open(shard_path(digest, pair)) as f:
+            return json.load(f)
+    except (IOError, ValueError):
+        return None
+
+
+def save_shard(digest, pair, shard):
+    # write to a temp file first so an interrupted run can't leave a
+    #   half-written shard behind
+    path = shard_path(digest, pair)
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with open(path + ".tmp", "w") as f:
+            json.dump(shard, f)
+        os.replace(path + ".tmp", path)
+    except IOError:
+        pass    # the cache is only an optimisation
+
+
+def scan_pairs(allwords, pairs_to_scan):
+    # one pass over the dictionary for all of the given pairs. Each shard
+    #   maps both prefixes of its pair to a list of [position, word], where
+    #   position is the word's index in the dictionary.
+    shards = {pair: {p: list() for p in pair} for pair in pairs_to_scan}
+    checks = [(p, shard[p]) for shard in shards.values() for p in shard]
+    for i, w in enumerate(allwords):
+        for p, matches in checks:
+            if w.startswith(p) and not w == p:
+                matches.append([i, w])
+    return shards
+
+
+def merge_shards(shards, pair_list=pairs):
+    # combine per-pair shards into {word: prefix}. Like a full scan, a word
+    #   matching several prefixes keeps the last one listed in pair_list, and
+    #   words stay in dictionary order.
+    assigned = dict()
+    for pair in pair_list:
+        for p in pair:
+            for i, w in shards[pair][p]:
+                assigned[i] = (w, p)
+    return dict(assigned[i] for i in sorted(assigned))
+
+
 def findpair(prefix):
     # get the specified prefix pair from pairs
     for pair in pairs:
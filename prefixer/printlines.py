@@ -1,14 +1,38 @@
 import sys
 import os
 import random
+import math
+import mmap
+import struct
+from array import array
 
 """
 Print n randomly-selected lines from the given file, where n is decided
     from user input.
+
+With --weight-field <n>, lines are picked with probability proportional to
+    a number in each line (the nth whitespace-separated field, counting from
+    1) instead of uniformly. Lines without a usable (finite) number there get
+    a weight of 0. The offset of every line and a Walker alias table for the
+    weights are built once and saved next to the file (<filename>.alias), so
+    each pick after that is O(1), however long the file is. The saved table
+    is memory-mapped rather than read in, so only the parts that get picked
+    are ever loaded.
 """
 
-ERR = "Bad arguments: run with ./printlines <filename> <num lines>"
+ERR = "Bad arguments: run with ./printlines <filename> <num lines> "\
+      "[--weight-field <n>]"
 FNF = "Error: file \'{}\' not found."
+NOW = "Error: no line in \'{}\' has a positive weight."
+
+# Bump this whenever the layout of the .alias files changes
+ALIAS_FORMAT = 3
+
+# Header of a .alias file: format, size and mtime of the file it's for,
+#   weight field and number of lines. The offsets (8 bytes each), prob (8)
+#   and alias (4) arrays follow it, and it's a multiple of 8 bytes long so
+#   they all start on aligned addresses.
+ALIAS_HEADER = struct.Struct("<IQqIQ")
 
 
 #Source: https://stackoverflow.com/a/56973905
@@ -26,10 +50,109 @@ def get_random_line(f, file_size: int) -> str:
         # else: line is empty -> EOF -> try another position in next iteration
 
 
+def build_alias_table(weights):
+    """
+    Return (prob, alias) arrays for Walker's alias method (Vose's version):
+        to pick an index, choose i uniformly, then keep i with probability
+        prob[i] or use alias[i] otherwise. Everything is kept in arrays
+        rather than lists, as there can be tens of millions of lines.
+    """
+    n = len(weights)
+    scale = n / sum(weights)
+    prob = array("d", map(scale.__mul__, weights))
+    alias = array("I", range(n))
+
+    small = array("I", (i for i in range(n) if prob[i] < 1.0))
+    large = array("I", (i for i in range(n) if prob[i] >= 1.0))
+    while small and large:
+        s = small.pop()
+        l = large[-1]
+        alias[s] = l
+        prob[l] -= 1.0 - prob[s]
+        if prob[l] < 1.0:
+            small.append(large.pop())
+    # Whatever's left is (up to rounding error) exactly 1
+    for i in small + large:
+        prob[i] = 1.0
+    return (prob, alias)
+
+
+def load_weighted_index(filename, field):
+    """
+    Return (offsets, prob, alias) for picking lines of filename weighted by
+        the given field, using the saved copy next to the file if the file
+        hasn't changed since it was made. The saved copy's arrays are
+        memoryviews of it mapped into memory.
+    """
+    st = os.stat(filename)
+    key = (ALIAS_FORMAT, st.st_size, st.st_mtime_ns, field)
+    index_file = filename + ".alias"
+    try:
+        with open(index_file, "rb") as f:
+            buf = memoryview(mmap.mmap(f.fileno(), 0,
+                                       access=mmap.ACCESS_READ))
+        header = ALIAS_HEADER.unpack_from(buf)
+        n = header[-1]
+        if header[:-1] == key and \
+                len(buf) == ALIAS_HEADER.size + n * (8 + 8 + 4):
+            arrays = list()
+            pos = ALIAS_HEADER.size
+            for typecode, size in (("Q", 8), ("d", 8), ("I", 4)):
+                arrays.append(buf[pos:pos + n*size].cast(typecode))
+                pos += n * size
+            return tuple(arrays)
+    except (IOError, ValueError, struct.error):
+        pass
+
+    offsets = array("Q")
+    weights = array("d")
+    pos = 0
+    with open(filename, "rb") as f:
+        for line in f:
+            offsets.append(pos)
+            pos += len(line)
+            fields = line.split()
+            try:
+                weight = float(fields[field-1])
+            except (IndexError, ValueError):
+                weight = 0.0
+            if not (math.isfinite(weight) and weight > 0):
+                weight = 0.0    # nan or inf would break the whole table
+            weights.append(weight)
+
+    if not any(w > 0 for w in weights):
+        print(NOW.format(filename))
+        exit()
+
+    prob, alias = build_alias_table(weights)
+    del weights
+    # The arrays are written straight out rather than copied into bytes, and
+    #   to a temp file first, as other runs may have the old one mapped
+    try:
+        with open(index_file + ".tmp", "wb") as f:
+            f.write(ALIAS_HEADER.pack(*key, len(offsets)))
+            for a in (offsets, prob, alias):
+                a.tofile(f)
+        os.replace(index_file + ".tmp", index_file)
+    except IOError:
+        pass    # just means it'll be rebuilt next time
+    return (offsets, prob, alias)
+
+
+def get_weighted_line(f, offsets, prob, alias) -> str:
+    i = random.randrange(len(offsets))
+    if random.random() >= prob[i]:
+        i = alias[i]
+    f.seek(offsets[i])
+    return f.readline().decode()
+
+
 def main():
     # Check arguments 
     argc = len(sys.argv)
-    if argc != 3 or not sys.argv[2].isdigit():
+    weighted = argc == 5 and sys.argv[3] == "--weight-field" and \
+                sys.argv[4].isdigit() and int(sys.argv[4]) > 0
+    if (argc != 3 and not weighted) or not sys.argv[2].isdigit():
         print(ERR)
         exit()
 
@@ -38,11 +161,18 @@ def main():
     numlines = int(sys.argv[2])
     lines = list()
     try:
-        with open(filename) as f:
-            file_size = os.path.getsize(filename)
-            lines = [get_random_line(f, file_size) for x in range(numlines)]
+        if weighted:
+            offsets, prob, alias = load_weighted_index(filename,
+                                                       int(sys.argv[4]))
+            with open(filename, "rb") as f:
+                lines = [get_weighted_line(f, offsets, prob, alias)
+                         for x in range(numlines)]
+        else:
+            with open(filename) as f:
+                file_size = os.path.getsize(filename)
+                lines = [get_random_line(f, file_size) for x in range(numlines)]
     except IOError:
-        print(FNF)
+        print(FNF.format(filename))
         exit()
 
     [print(line) for line in lines]
@@ -1,6 +1,10 @@
-import json
 import sys
-from collections import defaultdict
+from anagram_index import AnagramIndex
+from dict_loader import cache_key, load_words
+from live_index import LiveIndex, delta_path
+from lru_cache import LRUCache
+from phrase_anagrams import PhraseSolver
+from pattern_index import PatternIndex, is_pattern, valid_pattern
 
 """
 This program parses an (English) dictionary from a json file, and gives a
@@ -13,58 +17,158 @@ An anagram is "a word or phrase made by transposing the letters of another word
 
 This program's results include words with removed letters (not only 
     transposed). 
+
+With --phrase, it instead finds phrases of words that use up every given
+    letter exactly once (e.g. "dormitory" -> "dirty room").
+
+It can also find words matching a crossword-style pattern instead, where
+    '?' is any one letter and '*' is any number of letters (e.g. "a?p?e").
 """
 
 
-def get_anagrams(dict_file, chars):
+# Indexes already built by this process, by dictionary file name
+_indexes = dict()
+_live_indexes = dict()
+_pattern_indexes = dict()
+
+# Results of get_anagrams, by dictionary and canonical query. Replace this
+#   with a differently sized LRUCache (e.g. one with a spill_dir) to tune it.
+anagram_cache = LRUCache(max_entries=1024)
+
+
+def get_index(dict_file):
+    """
+    Return the AnagramIndex for the given dictionary file, reusing the one
+        from an earlier call if the file hasn't changed.
     """
-    Return a list of words as described at the top of this file.
+    try:
+        key = cache_key(dict_file)
+    except OSError:
+        key = None  # load_words will report it
+
+    index = _indexes.get(dict_file)
+    if index is None or index.store.key != key:
+        store = load_words(dict_file)
+        index = AnagramIndex.load(store)
+        if index is None:
+            index = AnagramIndex.build(store)
+            index.save()
+        _indexes[dict_file] = index
+    return index
+
+
+def use_index(dict_file, index):
     """
+    Make get_index (and so get_anagrams) use the given AnagramIndex for
+        dict_file, e.g. one from shared_index, for as long as the file
+        doesn't change. index.store.key must be set.
+    """
+    _indexes[dict_file] = index
 
-    if not chars.isalpha():
-        sys.exit("get_anagrams: bad value for chars '{}'".format(chars))
 
-    words = load_json_dict(dict_file)
+def get_live_index(dict_file):
+    """
+    Return a LiveIndex following the delta log of the given dictionary file
+        (see live_index.py), reusing the one from an earlier call if the file
+        hasn't changed.
+    """
+    index = get_index(dict_file)
+    live = _live_indexes.get(dict_file)
+    if live is None or live.origin is not index:
+        live = LiveIndex(index, delta_path(dict_file))
+        _live_indexes[dict_file] = live
+    return live
 
-    if not words:
-        sys.exit("No words found in given dictionary file.")
 
-    # Store all words in dictionary as {"sorted letters": [matching words]} pairs.
-    word_dict = defaultdict(list)  # dict of [sorted letters in word]: [words]
-    for word in words:
-        word_dict["".join(sorted(word))].append(word)
+def get_pattern_index(dict_file):
+    """
+    Return the PatternIndex for the given dictionary file, reusing the one
+        from an earlier call if the file hasn't changed.
+    """
+    store = load_words(dict_file)
+    index = _pattern_indexes.get(dict_file)
+    if index is None or index.store is not store:
+        index = PatternIndex(store)
+        _pattern_indexes[dict_file] = index
+    return index
 
-    results = list()
 
-    # Results are stored in a list of lists where each inner list stores words
-    #   containing exactly the same characters (in different orders)
-    for c, w in word_dict.items():
-        if chars[0] in c and set(c).issubset(set(chars)):
-            results.append(w)
+def get_pattern_matches(dict_file, pattern):
+    """
+    Return a sorted list of the words matching the given pattern, where '?'
+        matches any one letter and '*' matches any number of letters.
+    """
+    if not valid_pattern(pattern):
+        sys.exit("get_pattern_matches: bad value for pattern '{}'"\
+                    .format(pattern))
 
-    # Flatten list
-    results = [x for l in results for x in l]
-    return results
+    index = get_pattern_index(dict_file)
+    return [index.store[i] for i in index.query(pattern.lower())]
 
 
-def load_json_dict(filename):
+def get_anagrams(dict_file, chars, min_len=0):
     """
-    Parse and return the contents of a dictionary file in json format
+    Return a list of words as described at the top of this file, leaving
+        out any shorter than min_len.
     """
-    try:
-        with open(filename) as word_file:
-            valid_words = set(json.loads(word_file.read()))
-            return valid_words
-    except IOError:
-        sys.exit("Could not open file '{}'.".format(filename))
 
+    if not chars.isalpha():
+        sys.exit("get_anagrams: bad value for chars '{}'".format(chars))
+
+    live = get_live_index(dict_file)
+    live.refresh()
+
+    # Letter order and repeats don't change the answer, so "tab" and "tba"
+    #   share an entry. Edits from the delta log bump the version, and a new
+    #   log (which starts counting again) has a different log_id.
+    chars = chars.lower()
+    key = (live.origin.store.key, live.log_id, live.version,
+           "".join(sorted(set(chars))), chars[0], min_len)
+    cached = anagram_cache.get(key)
+    if cached is None:
+        words = [w for w in live.query(chars) if len(w) >= min_len]
+        anagram_cache.put(key, "\n".join(words).encode())
+        return words
+    return cached.decode().split("\n") if cached else []
+
+
+def get_phrase_anagrams(dict_file, letters, max_results=100, time_limit=5.0,
+                        min_word_len=3):
+    """
+    Return a tuple of (phrases, complete), where phrases is a list of
+        phrases that use every letter in letters exactly once, and complete
+        is False if the search was cut short by max_results or time_limit
+        (in seconds). Spaces in letters are ignored.
+    """
+    letters = letters.replace(" ", "").lower()
+    if not letters.isalpha():
+        sys.exit("get_phrase_anagrams: bad value for letters '{}'"\
+                    .format(letters))
+
+    # Go through the live index, so edits from the delta log are used too
+    words = get_live_index(dict_file).query(letters, use_required=False)
+    solver = PhraseSolver(letters, words, min_word_len)
+    return solver.solve(max_results, time_limit)
 
-def main():
-    if len(sys.argv) != 3:
-        sys.exit("Bad arguments. Usage: {} <dict file> <chars>\n"\
-                     .format(sys.argv[0]))
 
-    results = get_anagrams(sys.argv[1], sys.argv[2])
+def main():
+    phrase = len(sys.argv) == 4 and sys.argv[3] == "--phrase"
+    if len(sys.argv) != 3 and not phrase:
+        sys.exit("Bad arguments. Usage: {} <dict file> <chars or pattern> "
+                 "[--phrase]\n".format(sys.argv[0]))
+
+    if phrase:
+        results, complete = get_phrase_anagrams(sys.argv[1], sys.argv[2])
+        print("found {} phrases{}: ".format(len(results),
+                "" if complete else " (stopped early)"))
+        for r in results:
+            print(r)
+        return
+
+    if is_pattern(sys.argv[2]):
+        results = get_pattern_matches(sys.argv[1], sys.argv[2])
+    else:
+        results = get_anagrams(sys.argv[1], sys.argv[2])
     print("found {} words: \n{}".format(len(results), sorted(results)))
 
 
@@ -0,0 +1,137 @@
+from array import array
+from dict_loader import load_cached, save_cached
+
+"""
+Letter-set index used to find anagrams: every word in a WordStore is
+    given a letter mask (one bit per distinct letter), and word IDs are
+    grouped by mask.
+"""
+
+# Bit for each letter in a word's letter mask. Anything outside a-z (e.g.
+#   accented letters) shares one bit, so words with it have to be checked
+#   letter by letter when a query allows it.
+LETTER_BITS = {chr(ord("a") + i): 1 << i for i in range(26)}
+OTHER_BIT = 1 << 26
+
+
+class AnagramIndex:
+    """
+    Index of a WordStore by the set of letters in each word. Word IDs are
+        grouped by letter mask, so a query only has to check each distinct
+        set of letters once rather than every word.
+    """
+
+    def __init__(self, store, ids, group_masks, group_starts):
+        """
+        ids is every word ID in store sorted by letter mask, group_masks is
+            each distinct mask, and group_starts is where each mask's run of
+            IDs starts (plus a final entry for the end of ids).
+        """
+        self.store = store
+        self.ids = ids
+        self.group_masks = group_masks
+        self.group_starts = group_starts
+
+    @classmethod
+    def build(cls, store, masks=None):
+        """
+        Index the given WordStore. masks can be passed in if the letter mask
+            of each word (by ID) has already been worked out.
+        """
+        if masks is None:
+            masks = [letter_mask(w) for w in store]
+
+        ids = array("I", sorted(range(len(masks)), key=masks.__getitem__))
+        group_masks = array("I")
+        group_starts = array("I")
+        prev = None
+        for i, word_id in enumerate(ids):
+            if masks[word_id] != prev:
+                prev = masks[word_id]
+                group_masks.append(prev)
+                group_starts.append(i)
+        group_starts.append(len(ids))
+        return cls(store, ids, group_masks, group_starts)
+
+    @classmethod
+    def load(cls, store):
+        """
+        Return the cached index of store, or None if it hasn't been saved.
+        """
+        cached = load_cached(store.key, "anagrams")
+        if cached is None:
+            return None
+        arrays = list()
+        for b in cached:
+            a = array("I")
+            a.frombytes(b)
+            arrays.append(a)
+        return cls(store, *arrays)
+
+    def word_masks(self):
+        """
+        Return a list of the letter mask of every word, by word ID.
+        """
+        masks = [0] * len(self.ids)
+        ids = self.ids
+        starts = self.group_starts
+        for i, m in enumerate(self.group_masks):
+            for word_id in ids[starts[i]:starts[i+1]]:
+                masks[word_id] = m
+        return masks
+
+    def save(self):
+        """
+        Cache this index next to its dictionary.
+        """
+        save_cached(self.store.key, "anagrams",
+                    (self.ids.tobytes(), self.group_masks.tobytes(),
+                     self.group_starts.tobytes()))
+
+    def query(self, chars, use_required=True):
+        """
+        Return the IDs (in sorted order) of every word using only letters in
+            chars, and always using chars[0] unless use_required is False.
+        """
+        required, disallowed = query_masks(chars, use_required)
+        ids = self.ids
+        starts = self.group_starts
+        results = list()
+        for i, m in enumerate(self.group_masks):
+            if m & required and not m & disallowed:
+                group = ids[starts[i]:starts[i+1]]
+                if m & OTHER_BIT:
+                    group = [word_id for word_id in group if word_matches(
+                        self.store[word_id], chars, use_required)]
+                results.extend(group)
+        results.sort()
+        return results
+
+
+def letter_mask(word):
+    """
+    Return an int with one bit set for each distinct letter in word.
+    """
+    m = 0
+    for c in set(word):
+        m |= LETTER_BITS.get(c, OTHER_BIT)
+    return m
+
+
+def query_masks(chars, use_required=True):
+    """
+    Return (required, disallowed) masks for a query: a word's letter mask m
+        matches if m & required and not m & disallowed, and (if m has
+        OTHER_BIT set) word_matches() says so too.
+    """
+    required = letter_mask(chars[0]) if use_required else ~0
+    disallowed = ~letter_mask(chars)
+    return (required, disallowed)
+
+
+def word_matches(word, chars, use_required=True):
+    """
+    Return whether word uses only letters in chars (and chars[0], unless
+        use_required is False), checking every letter rather than the mask.
+    """
+    return set(word) <= set(chars) and (not use_required or chars[0] in word)
@@ -0,0 +1,241 @@
+import marshal
+import os
+import sys
+from array import array
+from bisect import bisect_left
+from itertools import accumulate
+
+"""
+Shared loader for the json dictionary files used by word_game,
+    anagram_generator and prefixer.
+
+Words are normalized (stripped, lowercase), deduplicated and sorted, and
+    returned as a compact WordStore. The store is kept in a marshal cache file
+    keyed by the dictionary's path, size and mtime, so after the first load
+    the json file doesn't need to be parsed again until it changes.
+"""
+
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "dict_loader")
+
+# Bump this whenever the normalization or cache layout changes
+CACHE_VERSION = 2
+
+# Stores already loaded by this process, by cache key
+_loaded = dict()
+
+
+class WordStore:
+    """
+    Compact, read-only list of sorted words. All of the words are kept
+        back to back in one utf-8 buffer (blob), with an offset table saying
+        where each one starts. Everything else refers to words by their
+        index here (word ID), and they only become str objects when they're
+        looked up.
+    """
+
+    def __init__(self, blob, offsets, key=None):
+        """
+        blob is a bytes-like object holding every word, and offsets is an
+            array of unsigned ints with one entry per word plus a final one
+            for the end of the blob. key is the cache key of the dictionary
+            file the words came from, if any.
+        """
+        self.blob = blob
+        self.offsets = offsets
+        self.key = key
+
+    @classmethod
+    def from_words(cls, words):
+        """
+        Create a store from a sorted list of unique words.
+        """
+        encoded = [w.encode() for w in words]
+        offsets = array("I", [0])
+        offsets.extend(accumulate(len(w) for w in encoded))
+        return cls(b"".join(encoded), offsets)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, word_id):
+        """
+        Return the word with the given ID as a str.
+        """
+        if not 0 <= word_id < len(self):
+            raise IndexError("word ID out of range")
+        start, end = self.offsets[word_id], self.offsets[word_id+1]
+        return str(self.blob[start:end], "utf-8")
+
+    def __iter__(self):
+        blob = self.blob
+        offsets = self.offsets
+        for i in range(len(self)):
+            yield str(blob[offsets[i]:offsets[i+1]], "utf-8")
+
+    def __contains__(self, word):
+        return self.find(word) >= 0
+
+    def word_bytes(self, word_id):
+        """
+        Return the raw utf-8 bytes of the word with the given ID.
+        """
+        return bytes(self.blob[self.offsets[word_id]:self.offsets[word_id+1]])
+
+    def find(self, word):
+        """
+        Return the ID of word, or -1 if it isn't in the store. Words are
+            sorted, so this is a binary search over the offset table.
+        """
+        target = word.encode()
+        i = bisect_left(range(len(self)), target, key=self.word_bytes)
+        if i < len(self) and self.word_bytes(i) == target:
+            return i
+        return -1
+
+
+def load_words(filename):
+    """
+    Return the words in the given json dictionary file as a WordStore of
+        sorted, unique, normalized words. Exits with an error message if the
+        file can't be read or doesn't contain any words.
+    """
+    try:
+        key = cache_key(filename)
+    except OSError:
+        sys.exit("Error: could not open (or perhaps find) file '{}'."\
+                    .format(filename))
+
+    if key in _loaded:
+        return _loaded[key]
+
+    store = _load_cache(key)
+    if store is None:
+        words = normalize(read_words(filename))
+        if not words:
+            sys.exit("Error: '{}' is not a valid dictionary.".format(filename))
+        store = WordStore.from_words(words)
+        store.key = key
+        _save_cache(key, store)
+    _loaded[key] = store
+    return store
+
+
+def cache_key(filename):
+    """
+    Return the key that cached data about the given dictionary file is
+        stored under: its path, size and mtime. Raises OSError if the file
+        doesn't exist.
+    """
+    st = os.stat(filename)
+    return (CACHE_VERSION, os.path.abspath(filename), st.st_size,
+            st.st_mtime_ns)
+
+
+def prime_cache(filename, store):
+    """
+    Save a WordStore built some other way (e.g. by index_builder) as the
+        cached words for the given dictionary file, so the next load_words()
+        of it doesn't have to parse it.
+    """
+    store.key = cache_key(filename)
+    _save_cache(store.key, store)
+    _loaded[store.key] = store
+
+
+def normalize(words):
+    """
+    Return the given words as a sorted list with no duplicates, blanks or
+        uppercase letters.
+    """
+    return sorted(set(w.strip().lower() for w in words) - {""})
+
+
+def read_words(filename):
+    """
+    Return the words in the json file as they are, without normalizing them.
+        Works with either a list of words or an object with the words as
+        keys.
+    """
+    # Only needed when there's no cache, so don't slow down every start up
+    import json
+    try:
+        with open(filename) as f:
+            data = json.load(f)
+    except IOError:
+        sys.exit("Error: could not open (or perhaps find) file '{}'."\
+                    .format(filename))
+    except ValueError:
+        data = None
+
+    if not isinstance(data, (list, dict)) or \
+            not all(isinstance(w, str) for w in data):
+        sys.exit("Error: '{}' is not a valid dictionary.".format(filename))
+    return list(data)
+
+
+def load_cached(key, name):
+    """
+    Return data saved with save_cached() under the given name for the
+        dictionary with the given cache key, or None if there isn't any (or
+        the dictionary has changed since). Lets other modules cache things
+        they work out from a dictionary next to the dictionary itself.
+    """
+    if key is None:
+        return None
+    try:
+        with open(_cache_path(key, name), "rb") as f:
+            cached_key, data = marshal.load(f)
+    except (IOError, EOFError, ValueError, TypeError):
+        return None
+    if cached_key != key:
+        return None
+    return data
+
+
+def save_cached(key, name, data):
+    """
+    Save marshal-able data under the given name for the dictionary with the
+        given cache key. Failing to do so isn't an error, it'll just be
+        worked out again next time.
+    """
+    if key is None:
+        return
+    path = _cache_path(key, name)
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with open(path + ".tmp", "wb") as f:
+            marshal.dump((key, data), f)
+        os.replace(path + ".tmp", path)
+    except IOError:
+        pass
+
+
+def _cache_path(key, name):
+    """
+    Cache file for the named data about the dictionary at the path in the
+        given key.
+    """
+    import hashlib  # it loads OpenSSL, so only when a cache is used
+    digest = hashlib.sha256(key[1].encode()).hexdigest()
+    return os.path.join(CACHE_DIR, "{}.{}.marshal".format(digest, name))
+
+
+def _load_cache(key):
+    """
+    Return the cached WordStore for key, or None if it isn't cached or the
+        dictionary file has changed since.
+    """
+    data = load_cached(key, "words")
+    if data is None:
+        return None
+    blob, offset_bytes = data
+    offsets = array("I")
+    offsets.frombytes(offset_bytes)
+    return WordStore(blob, offsets, key)
+
+
+def _save_cache(key, store):
+    """
+    Write a WordStore to the cache.
+    """
+    save_cached(key, "words", (bytes(store.blob), store.offsets.tobytes()))
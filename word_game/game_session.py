@@ -0,0 +1,72 @@
+from bisect import insort
+
+"""
+The rules of word_game, without any of the curses drawing. A GameSession
+    keeps track of one game: which words there are to find, which ones have
+    been found so far, and what to tell the player about each guess. This
+    way a game can be driven by anything (the curses UI, or replay.py)
+    without needing a terminal.
+"""
+
+# Possible results of GameSession.submit_guess
+GOOD, REPEAT, BAD_LETTERS, TOO_SMALL, MISSING_REQUIRED, WRONG = range(6)
+
+
+class GameSession:
+    """
+    State of a single game: the letters, the minimum word size, the words
+        to find and the words found so far.
+    """
+
+    def __init__(self, chars, min_chars, words):
+        """
+        chars is the letters to play with, where the first one is required
+            in every word. words is every word the player has to find.
+        """
+        self.require_char = chars[0]
+        self.chars = ''.join(sorted(set(chars)))
+        self.min_chars = min_chars
+        self.words = words
+        self.found_words = list()   # kept sorted for display
+
+        self._word_set = set(words)
+        self._found_set = set()
+
+    def submit_guess(self, guess):
+        """
+        Check a guess and record it if it's a new correct word.
+        Return a tuple of (result, message), where result is one of the
+            constants at the top of this file and message is what to show
+            the player.
+        """
+        if guess in self._word_set and guess not in self._found_set:
+            self._found_set.add(guess)
+            insort(self.found_words, guess)
+            return (GOOD, "Good job!")
+        elif guess in self._found_set:
+            return (REPEAT, "You already got that one!")
+
+        # Check if user used bad letters
+        bad_letters = set([x for x in guess if x not in self.chars])
+        if bad_letters:
+            return (BAD_LETTERS, "Bad letters: {}".format("".join(bad_letters)))
+        elif len(guess) < self.min_chars:
+            return (TOO_SMALL, "That word was too small.")
+        elif not self.require_char in guess:
+            return (MISSING_REQUIRED, "'{}' must appear in every word."\
+                                        .format(self.require_char))
+        else:
+            return (WRONG, "Wrong: {}".format(guess))
+
+    def progress(self):
+        """
+        Return a string describing how many words have been found.
+        """
+        return "Found {} of {} words".format(len(self.found_words),
+                                             len(self.words))
+
+    def is_won(self):
+        """
+        Return whether every word has been found.
+        """
+        return len(self.found_words) == len(self._word_set)
@@ -0,0 +1,197 @@
+import json
+import os
+import sys
+from array import array
+from bisect import bisect_left
+from itertools import accumulate
+from multiprocessing import Pool
+from anagram_index import AnagramIndex
+from dict_loader import WordStore, normalize, prime_cache, read_words
+
+"""
+Builds one anagram index out of several dictionary files (e.g. a main word
+    list plus slang, technical and regional lists), using a pool of worker
+    processes.
+
+It runs in two rounds, so the parent process only ever shuffles bytes and
+    arrays around. First each worker parses, normalizes and sorts one of the
+    dictionary files. The combined word list is then cut into shards of
+    roughly equal size, each one a range of the sorted words, and each worker
+    deduplicates one shard and builds its AnagramIndex. As the shards are
+    ranges, the parent just has to put them end to end and join up the runs
+    of word IDs with the same letter mask, so the result is exactly the same
+    as building the index from the merged list in one process.
+
+Run it as "python3 index_builder.py <output json> <dict files...> [-j N]" to
+    write the merged dictionary to <output json> and cache its index, so
+    word_game and anagram_generator can use it straight away.
+"""
+
+USAGE = "Usage: python3 {} <output json> <dict files...> [-j <processes>]"
+
+# Don't bother splitting into shards smaller than this
+MIN_SHARD_SIZE = 50000
+
+# Take every this-many-th word as a sample when choosing where to cut shards
+SAMPLE_EVERY = 1000
+
+
+def build_index(filenames, processes=None):
+    """
+    Return an AnagramIndex (and its WordStore, as index.store) of every word
+        in the given json dictionary files. processes is how many worker
+        processes to use, defaulting to one per core; 1 builds it all in
+        this process.
+    """
+    processes = processes or os.cpu_count() or 1
+    if processes == 1:
+        return _build(filenames, 1, map)
+    with Pool(processes) as pool:
+        return _build(filenames, processes, pool.map)
+
+
+def _build(filenames, processes, run):
+    """
+    Do the work of build_index(), using run (map or a pool's map) to hand it
+        out.
+    """
+    files = list(run(_read_file, filenames))
+    for f in files:
+        if isinstance(f, str):
+            sys.exit(f)
+
+    total = sum(len(starts) - 1 for blob, starts in files)
+    shard_count = max(1, min(processes, total // MIN_SHARD_SIZE))
+    bounds = _split_words(files, shard_count)
+
+    shards = [list() for i in range(shard_count)]
+    for blob, starts in files:
+        n = len(starts) - 1
+        cuts = [0] + [bisect_left(range(n), b,
+                                  key=lambda i: _word(blob, starts, i))
+                      for b in bounds] + [n]
+        for shard, lo, hi in zip(shards, cuts, cuts[1:]):
+            shard.append(blob[starts[lo]:starts[hi]])
+    del files
+
+    return _merge_shards(list(run(_build_shard, shards)))
+
+
+def _read_file(filename):
+    """
+    Return (blob, starts) for one dictionary file: its normalized words in
+        sorted order as utf-8, each followed by a newline, and where each
+        word starts in blob (plus a final entry for the end of blob). If the
+        file can't be read, return the error message instead.
+    """
+    try:
+        words = normalize(read_words(filename))
+    except SystemExit as e:
+        # Exiting would take the worker down with it, so let the parent do it
+        return str(e.code)
+    encoded = [w.encode() + b"\n" for w in words]
+    starts = array("I", [0])
+    starts.extend(accumulate(len(w) for w in encoded))
+    return (b"".join(encoded), starts)
+
+
+def _word(blob, starts, i):
+    return blob[starts[i]:starts[i+1]-1]
+
+
+def _split_words(files, shard_count):
+    """
+    Return the shard_count - 1 words (as utf-8) to cut the combined, sorted
+        words of files at so the shards come out about the same size. Sorted
+        utf-8 is in the same order as sorted str, so they can be compared
+        without decoding anything.
+    """
+    sample = sorted(_word(blob, starts, i) for blob, starts in files
+                    for i in range(0, len(starts) - 1, SAMPLE_EVERY))
+    return [sample[len(sample) * k // shard_count]
+            for k in range(1, shard_count)]
+
+
+def _build_shard(chunks):
+    """
+    Return the AnagramIndex of one shard, given its newline-separated
+        words from each file.
+    """
+    words = set()
+    for chunk in chunks:
+        words.update(chunk.decode().split("\n"))
+    words.discard("")
+    return AnagramIndex.build(WordStore.from_words(sorted(words)))
+
+
+def _merge_shards(indexes):
+    """
+    Put the AnagramIndexes of consecutive ranges of words together into one.
+        Word IDs in each shard are shifted up by the number of words before
+        it, and each letter mask's runs of IDs are joined up in shard order,
+        so they stay sorted.
+    """
+    if len(indexes) == 1:
+        return indexes[0]
+
+    offsets = array("I", [0])
+    runs = dict()           # {letter mask: [runs of word IDs]}
+    word_base = 0
+    for index in indexes:
+        store = index.store
+        offsets.extend(map(offsets[-1].__add__, store.offsets[1:]))
+        ids = array("I", map(word_base.__add__, index.ids))
+        starts = index.group_starts
+        for i, m in enumerate(index.group_masks):
+            runs.setdefault(m, list()).append(ids[starts[i]:starts[i+1]])
+        word_base += len(store)
+
+    ids = array("I")
+    group_masks = array("I", sorted(runs))
+    group_starts = array("I")
+    for m in group_masks:
+        group_starts.append(len(ids))
+        for run in runs[m]:
+            ids.extend(run)
+    group_starts.append(len(ids))
+
+    blob = b"".join(bytes(index.store.blob) for index in indexes)
+    return AnagramIndex(WordStore(blob, offsets), ids, group_masks,
+                        group_starts)
+
+
+def main():
+    args = sys.argv[1:]
+    processes = None
+    if "-j" in args:
+        i = args.index("-j")
+        if i+1 >= len(args) or not args[i+1].isdigit() or \
+                int(args[i+1]) < 1:
+            sys.exit(USAGE.format(sys.argv[0]))
+        processes = int(args[i+1])
+        del args[i:i+2]
+    if len(args) < 2:
+        sys.exit(USAGE.format(sys.argv[0]))
+
+    output, filenames = args[0], args[1:]
+    index = build_index(filenames, processes)
+    store = index.store
+    if not len(store):
+        sys.exit("No words found in the given dictionary files.")
+
+    try:
+        with open(output, "w") as f:
+            json.dump(list(store), f)
+    except IOError:
+        sys.exit("Error: could not write file '{}'.".format(output))
+
+    # Cache the words and index under the new file, so the first game using
+    #   it doesn't have to redo any of this
+    prime_cache(output, store)
+    index.save()
+    print("Wrote {} words from {} dictionaries to '{}'."\
+            .format(len(store), len(filenames), output))
+
+
+if __name__ == "__main__":
+    main()
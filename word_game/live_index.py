@@ -0,0 +1,312 @@
+import os
+import sys
+import threading
+from heapq import merge
+from array import array
+from anagram_index import (AnagramIndex, OTHER_BIT, letter_mask, query_masks,
+                           word_matches)
+from dict_loader import WordStore, load_cached, normalize, save_cached
+
+"""
+An anagram index that can have words added and removed without a rebuild.
+
+Changes go into an append-only delta log file next to the dictionary
+    ("<dict file>.delta"), one per line: "+word" to add it, "-word" to
+    remove it. Every process using the dictionary reads new lines from the
+    log before each query and merges them with the base index at query time,
+    so edits show up straight away everywhere. Once the delta gets big, a
+    background thread folds it into a new base index, and caches that next
+    to the dictionary so other processes can start from it instead of
+    replaying the whole log.
+
+A new log starts with a random "#" header line, so a log that has been
+    deleted and written again is never mistaken for the one it replaced.
+
+The log itself is never rewritten here; to make the edits permanent, merge
+    them into the dictionary file (e.g. with index_builder) and delete the log.
+
+Run it as "python3 live_index.py <dict file> add|remove <words...>" to log
+    edits from the command line.
+"""
+
+USAGE = "Usage: python3 {} <dict file> add|remove <words...>"
+
+# Fold the delta into the base index once it has this many words in it
+COMPACT_AT = 2000
+
+
+def delta_path(dict_file):
+    """
+    Return the path of the delta log for the given dictionary file.
+    """
+    return dict_file + ".delta"
+
+
+def append_delta(log_path, sign, words):
+    """
+    Log adding ("+") or removing ("-") the given words.
+    """
+    lines = "".join(sign + w + "\n" for w in normalize(words))
+    if not os.path.exists(log_path):
+        _create_log(log_path)
+    with open(log_path, "a") as f:
+        f.write(lines)
+
+
+def _create_log(log_path):
+    """
+    Start a new log with its header. The header is written to a temp file
+        and linked into place, so it's the first line even if other
+        processes are appending at the same time.
+    """
+    tmp = "{}.{}.tmp".format(log_path, os.getpid())
+    with open(tmp, "w") as f:
+        f.write("#{}\n".format(os.urandom(8).hex()))
+    try:
+        os.link(tmp, log_path)
+    except OSError:
+        pass    # someone else got there first (or links aren't supported)
+    finally:
+        os.remove(tmp)
+
+
+def _log_id(log_path, st):
+    """
+    Return a string identifying the log file with the given stat result:
+        where it is on disk, and its first (header) line.
+    """
+    with open(log_path, "rb") as f:
+        first = f.readline(100)
+    return "{}:{}:{}".format(st.st_dev, st.st_ino,
+                             first.decode(errors="replace").strip())
+
+
+class LiveIndex:
+    """
+    A base AnagramIndex plus the words added to and removed from it since.
+    """
+
+    def __init__(self, base, log_path, compact_at=COMPACT_AT):
+        """
+        base is the AnagramIndex of the dictionary file, and log_path is the
+            delta log to follow (it doesn't need to exist yet).
+        """
+        self.log_path = log_path
+        self.compact_at = compact_at
+        self.log_id = None      # which log file the entries came from
+        self.version = 0        # number of log entries applied so far
+
+        self.origin = base     # kept in case the log gets replaced
+        self._base = base
+        self._ops = list()      # log entries not yet folded into _base
+        self._log_pos = 0
+        self._log_stat = None   # (size, mtime) of the log when last read
+        self._lock = threading.Lock()
+        self._compactor = None
+        self._generation = 0    # bumped when the log is replaced
+        self._reset_delta()
+
+    def add_words(self, words):
+        """
+        Add words to the dictionary (for every process following the log).
+        """
+        self._append("+", words)
+
+    def remove_words(self, words):
+        """
+        Remove words from the dictionary (for every process following the
+            log).
+        """
+        self._append("-", words)
+
+    def query(self, chars, use_required=True):
+        """
+        Like AnagramIndex.query, but return the matching words themselves
+            (in sorted order), with the delta log applied.
+        """
+        self.refresh()
+        with self._lock:
+            store = self._base.store
+            removed = self._removed
+            ids = self._base.query(chars, use_required)
+            base_words = (store[i] for i in ids if i not in removed)
+            required, disallowed = query_masks(chars, use_required)
+            added = sorted(w for w, m in self._added.items()
+                           if m & required and not m & disallowed and
+                           (not m & OTHER_BIT or
+                            word_matches(w, chars, use_required)))
+            return list(merge(base_words, added))
+
+    def refresh(self):
+        """
+        Apply any log entries written (by any process) since the last call.
+        """
+        try:
+            st = os.stat(self.log_path)
+        except OSError:
+            st = None
+
+        with self._lock:
+            if st is None:
+                if self._log_pos:
+                    self._start_over()  # the log was deleted
+                return
+            if (st.st_size, st.st_mtime_ns) == self._log_stat:
+                return
+
+            if self._log_pos and (st.st_size <= self._log_pos or
+                                  _log_id(self.log_path, st) != self.log_id):
+                # The log was replaced, or rewritten in place (it changed
+                #   without growing): start again from scratch
+                self._start_over()
+            self._log_stat = (st.st_size, st.st_mtime_ns)
+            if not self._log_pos:
+                self.log_id = _log_id(self.log_path, st)
+                self._load_compacted(st.st_size)
+            if st.st_size == self._log_pos:
+                return
+
+            with open(self.log_path, "rb") as f:
+                f.seek(self._log_pos)
+                data = f.read(st.st_size - self._log_pos)
+            # Leave a half-written last line for next time
+            end = data.rfind(b"\n") + 1
+            self._log_pos += end
+            for line in data[:end].decode().splitlines():
+                if line[:1] in ("+", "-") and line[1:]:
+                    self._apply(line[0], line[1:])
+                    self._ops.append((line[0], line[1:]))
+                    self.version += 1
+
+            if len(self._added) + len(self._removed) >= self.compact_at:
+                self._start_compaction()
+
+    def compact(self):
+        """
+        Fold the current delta into a new base index. Entries logged while
+            this is running are kept in the delta.
+        """
+        with self._lock:
+            base = self._base
+            generation = self._generation
+            log_id = self.log_id
+            log_pos = self._log_pos
+            version = self.version
+            folded = len(self._ops)
+            added = dict(self._added)
+            removed = set(self._removed)
+
+        # The slow part happens without the lock, so queries aren't blocked
+        masks = base.word_masks()
+        kept = ((base.store[i], masks[i]) for i in range(len(base.store))
+                if i not in removed)
+        words = list()
+        new_masks = list()
+        for word, mask in merge(kept, sorted(added.items())):
+            words.append(word)
+            new_masks.append(mask)
+        new_base = AnagramIndex.build(WordStore.from_words(words), new_masks)
+
+        with self._lock:
+            if generation != self._generation:
+                return  # the log was replaced while we were busy
+            self._base = new_base
+            self._ops = self._ops[folded:]
+            self._reset_delta()
+            for sign, word in self._ops:
+                self._apply(sign, word)
+
+        # Save it, so processes started later don't have to do this again
+        if log_id is not None:
+            save_cached(self.origin.store.key, "compacted",
+                        (log_id, log_pos, version) + _pack(new_base))
+
+    def _append(self, sign, words):
+        append_delta(self.log_path, sign, words)
+        self.refresh()
+
+    def _start_over(self):
+        self._base = self.origin
+        self._generation += 1
+        self._ops = list()
+        self._log_pos = 0
+        self._log_stat = None
+        self.log_id = None
+        self.version = 0
+        self._reset_delta()
+
+    def _load_compacted(self, log_size):
+        """
+        Start from the base index saved by the last compaction of this log
+            (by any process), if there is one.
+        """
+        saved = load_cached(self.origin.store.key, "compacted")
+        if saved is None:
+            return
+        log_id, log_pos, version = saved[:3]
+        if log_id != self.log_id or log_pos > log_size:
+            return
+        self._base = _unpack(saved[3:])
+        self._log_pos = log_pos
+        self.version = version
+
+    def _reset_delta(self):
+        self._added = dict()    # {word: letter mask} for words not in _base
+        self._removed = set()   # IDs of words in _base that were removed
+
+    def _apply(self, sign, word):
+        word_id = self._base.store.find(word)
+        if sign == "+":
+            if word_id >= 0:
+                self._removed.discard(word_id)
+            else:
+                self._added[word] = letter_mask(word)
+        else:
+            if word_id >= 0:
+                self._removed.add(word_id)
+            else:
+                self._added.pop(word, None)
+
+    def _start_compaction(self):
+        if self._compactor is not None and self._compactor.is_alive():
+            return
+        self._compactor = threading.Thread(target=self.compact, daemon=True)
+        self._compactor.start()
+
+
+def _pack(index):
+    """
+    Return an AnagramIndex (and its WordStore) as a tuple of bytes.
+    """
+    store = index.store
+    return (bytes(store.blob), store.offsets.tobytes(), index.ids.tobytes(),
+            index.group_masks.tobytes(), index.group_starts.tobytes())
+
+
+def _unpack(data):
+    """
+    Return the AnagramIndex packed into data by _pack().
+    """
+    blob = data[0]
+    arrays = list()
+    for b in data[1:]:
+        a = array("I")
+        a.frombytes(b)
+        arrays.append(a)
+    return AnagramIndex(WordStore(blob, arrays[0]), *arrays[1:])
+
+
+def main():
+    if len(sys.argv) < 4 or sys.argv[2] not in ("add", "remove"):
+        sys.exit(USAGE.format(sys.argv[0]))
+
+    sign = "+" if sys.argv[2] == "add" else "-"
+    try:
+        append_delta(delta_path(sys.argv[1]), sign, sys.argv[3:])
+    except IOError:
+        sys.exit("Error: could not write to '{}'."\
+                    .format(delta_path(sys.argv[1])))
+
+
+if __name__ == "__main__":
+    main()
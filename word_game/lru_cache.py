@@ -0,0 +1,122 @@
+import marshal
+import os
+from collections import OrderedDict
+
+"""
+A small least-recently-used cache with hit/miss counters, and optionally a
+    second tier on disk. Entries pushed out of memory are written to the spill
+    directory and read back (and moved back into memory) the next time they're
+    asked for, so they survive both eviction and restarts.
+"""
+
+
+class LRUCache:
+    """
+    Bounded mapping from hashable keys to bytes values. Both keys and values
+        have to be marshal-able if a spill directory is used.
+    """
+
+    def __init__(self, max_entries=1024, max_bytes=None, spill_dir=None):
+        """
+        Keep at most max_entries values in memory, and at most max_bytes
+            bytes of values in total if given. spill_dir is a directory to
+            write evicted values to, or None to just drop them.
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.spill_dir = spill_dir
+        self.hits = 0
+        self.misses = 0
+        self.spill_hits = 0
+
+        self._entries = OrderedDict()
+        self._bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """
+        Return the value for key, or None if it isn't cached.
+        """
+        value = self._entries.get(key)
+        if value is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+        value = self._read_spill(key)
+        if value is not None:
+            self.spill_hits += 1
+            self.hits += 1
+            self.put(key, value)
+            return value
+
+        self.misses += 1
+        return None
+
+    def put(self, key, value):
+        """
+        Cache value for key, evicting the least recently used entries if
+            that goes over either limit.
+        """
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= len(old)
+        self._entries[key] = value
+        self._bytes += len(value)
+
+        while len(self._entries) > self.max_entries or \
+                (self.max_bytes is not None and self._bytes > self.max_bytes
+                 and len(self._entries) > 1):
+            old_key, old_value = self._entries.popitem(last=False)
+            self._bytes -= len(old_value)
+            self._write_spill(old_key, old_value)
+
+    def clear(self):
+        """
+        Drop everything held in memory (the spill directory is left alone)
+            and reset the counters.
+        """
+        self._entries.clear()
+        self._bytes = 0
+        self.hits = self.misses = self.spill_hits = 0
+
+    def stats(self):
+        """
+        Return a string summarising how well the cache is doing.
+        """
+        total = self.hits + self.misses
+        rate = self.hits / total * 100 if total else 0.0
+        return "{} entries, {} bytes, {} hits ({} from disk), {} misses "\
+               "({:.1f}% hit rate)".format(len(self._entries), self._bytes,
+                                           self.hits, self.spill_hits,
+                                           self.misses, rate)
+
+    def _spill_path(self, key):
+        import hashlib
+        name = hashlib.sha256(marshal.dumps(key)).hexdigest()
+        return os.path.join(self.spill_dir, name + ".marshal")
+
+    def _read_spill(self, key):
+        if self.spill_dir is None:
+            return None
+        try:
+            with open(self._spill_path(key), "rb") as f:
+                spilled_key, value = marshal.load(f)
+        except (IOError, EOFError, ValueError, TypeError):
+            return None
+        # Guard against the (unlikely) hash collision
+        return value if spilled_key == key else None
+
+    def _write_spill(self, key, value):
+        if self.spill_dir is None:
+            return
+        path = self._spill_path(key)
+        try:
+            os.makedirs(self.spill_dir, exist_ok=True)
+            with open(path + ".tmp", "wb") as f:
+                marshal.dump((key, value), f)
+            os.replace(path + ".tmp", path)
+        except IOError:
+            pass
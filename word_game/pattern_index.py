@@ -0,0 +1,140 @@
+from array import array
+from bisect import bisect_left
+from collections import defaultdict
+from dict_loader import load_cached, save_cached
+
+"""
+Crossword-style pattern lookups, like "a?p?e" (? is any one letter) or
+    "c*t" (* is any number of letters, including none).
+
+Words are indexed by (length, position, letter), each entry being a sorted
+    array of word IDs (postings). A pattern with fixed letters only has to
+    intersect the postings for those letters, instead of checking every word
+    in the dictionary. The index is cached next to the dictionary, so it only
+    needs building once per dictionary.
+"""
+
+
+class PatternIndex:
+    """
+    Position index over a WordStore.
+    """
+
+    def __init__(self, store):
+        """
+        Index the given WordStore, or load its index from the cache if it's
+            already been built.
+        """
+        self.store = store
+        cached = load_cached(store.key, "patterns")
+        if cached is None:
+            by_length, postings = self._build(store)
+            save_cached(store.key, "patterns",
+                        ({k: v.tobytes() for k, v in by_length.items()},
+                         {k: v.tobytes() for k, v in postings.items()}))
+        else:
+            by_length = {k: _to_array(v) for k, v in cached[0].items()}
+            postings = {k: _to_array(v) for k, v in cached[1].items()}
+
+        self.by_length = by_length  # length: [IDs of words that long]
+        self.postings = postings    # (length, position, letter): [IDs]
+
+    @staticmethod
+    def _build(store):
+        """
+        Return (by_length, postings) for every word in store.
+        """
+        by_length = defaultdict(lambda: array("I"))
+        postings = defaultdict(lambda: array("I"))
+        for word_id, word in enumerate(store):
+            n = len(word)
+            by_length[n].append(word_id)
+            for i, c in enumerate(word):
+                postings[(n, i, c)].append(word_id)
+        return dict(by_length), dict(postings)
+
+    def query(self, pattern):
+        """
+        Return the IDs (in sorted order) of every word matching pattern.
+        """
+        parts = pattern.split("*")
+        head, tail = parts[0], parts[-1]
+        fixed_len = sum(len(p) for p in parts)
+
+        if len(parts) == 1:
+            lengths = [fixed_len] if fixed_len in self.by_length else []
+            check = None
+        else:
+            lengths = sorted(n for n in self.by_length if n >= fixed_len)
+            # Letters between stars can't be tied to a position, so any
+            #   candidates still need checking against the whole pattern
+            check = None
+            if len(parts) > 2:
+                import re
+                from fnmatch import translate
+                check = re.compile(translate(pattern))
+
+        results = list()
+        for n in lengths:
+            # Fixed letters at the start are at known positions, and so are
+            #   fixed letters at the end once the length is known
+            fixed = [(i, c) for i, c in enumerate(head) if c != "?"]
+            if len(parts) > 1:
+                fixed += [(n - len(tail) + i, c) for i, c in enumerate(tail)
+                          if c != "?"]
+            ids = self._intersect(n, fixed)
+            if check is not None:
+                ids = [i for i in ids if check.match(self.store[i])]
+            results.extend(ids)
+        results.sort()
+        return results
+
+    def _intersect(self, n, fixed):
+        """
+        Return the IDs of words of length n with all of the given
+            (position, letter) pairs.
+        """
+        if not fixed:
+            return self.by_length[n]
+        lists = list()
+        for i, c in fixed:
+            posting = self.postings.get((n, i, c))
+            if posting is None:
+                return []
+            lists.append(posting)
+
+        # Walk the shortest list, looking each ID up in the others
+        lists.sort(key=len)
+        results = list()
+        for word_id in lists[0]:
+            for other in lists[1:]:
+                j = bisect_left(other, word_id)
+                if j == len(other) or other[j] != word_id:
+                    break
+            else:
+                results.append(word_id)
+        return results
+
+
+def is_pattern(s):
+    """
+    Return whether s is a pattern rather than plain letters.
+    """
+    return "?" in s or "*" in s
+
+
+def valid_pattern(s):
+    """
+    Return whether s is made of only letters, '?' and '*'.
+    """
+    letters = s.replace("?", "").replace("*", "")
+    return letters == "" or letters.isalpha()
+
+
+def _to_array(b):
+    """
+    Return an array of unsigned ints from its bytes.
+    """
+    a = array("I")
+    a.frombytes(b)
+    return a
@@ -0,0 +1,147 @@
+import time
+from collections import defaultdict
+from itertools import product
+
+"""
+Finds multi-word anagrams: phrases of dictionary words that use up every
+    one of the given letters exactly once (e.g. "dormitory" -> "dirty room").
+
+Each candidate word is turned into a count vector (how many of each input
+    letter it uses), and words with the same letters are grouped so the
+    search only deals with distinct letter multisets. The search is a
+    backtracking one: at each step it picks the remaining letter with the
+    fewest candidates to cover it and only tries candidates that cover it and
+    still fit in the remaining letters. It remembers which remaining-letter
+    multisets turned out to be dead ends so they're never searched twice.
+    Result limits and a time budget keep long inputs from taking forever.
+"""
+
+
+class _OutOfTime(Exception):
+    pass
+
+
+class PhraseSolver:
+    """
+    Search for phrases made from one set of letters.
+    """
+
+    # How many search steps to take between checks of the clock
+    CLOCK_INTERVAL = 1024
+
+    def __init__(self, letters, words, min_word_len=3):
+        """
+        letters is the string of letters to use up. words should contain
+            every dictionary word made up only of those letters (it can have
+            words that use a letter too many times, those are filtered out).
+        """
+        self.letters = sorted(set(letters))
+        self.target = self._count_vector(letters)
+
+        # Group words by count vector: {count vector: [words]}
+        groups = defaultdict(list)
+        for word in words:
+            if len(word) < min_word_len:
+                continue
+            vec = self._count_vector(word)
+            if self._fits(vec, self.target):
+                groups[vec].append(word)
+
+        # Try longer words first, since they use up letters faster
+        self.candidates = sorted(groups, key=lambda v: (-sum(v), v))
+        self.groups = groups
+
+        # Indexes of the candidates using each letter
+        self.by_letter = [[i for i, vec in enumerate(self.candidates) if vec[j]]
+                          for j in range(len(self.letters))]
+
+    def _count_vector(self, word):
+        return tuple(word.count(c) for c in self.letters)
+
+    @staticmethod
+    def _fits(vec, remaining):
+        return all(c <= r for c, r in zip(vec, remaining))
+
+    def solve(self, max_results=100, time_limit=5.0):
+        """
+        Return a tuple of (phrases, complete), where phrases is a list of up
+            to max_results phrases (strings of space-separated words) and
+            complete is False if the search stopped early because it ran
+            into one of the limits.
+        """
+        self._deadline = time.monotonic() + time_limit
+        self._steps = 0
+        self._dead_ends = set()
+        self._max_results = max_results
+        self._phrases = list()
+        self._seen = set()
+
+        complete = True
+        try:
+            self._search(self.target, [])
+        except _OutOfTime:
+            complete = False
+        if len(self._phrases) >= max_results:
+            complete = False
+        return (self._phrases[:max_results], complete)
+
+    def _search(self, remaining, chosen):
+        """
+        Find phrases that use up exactly the remaining letters, given the
+            candidates (indexes) chosen so far. Return whether any were found.
+        """
+        if not any(remaining):
+            self._add_phrases(chosen)
+            return True
+        if remaining in self._dead_ends:
+            return False
+
+        self._steps += 1
+        if self._steps % self.CLOCK_INTERVAL == 0 and \
+                time.monotonic() > self._deadline:
+            raise _OutOfTime()
+
+        # Some candidate has to use the remaining letter with the fewest
+        #   candidates, so only those need trying
+        letter = min((j for j, r in enumerate(remaining) if r),
+                     key=lambda j: len(self.by_letter[j]))
+
+        found = False
+        for i in self.by_letter[letter]:
+            vec = self.candidates[i]
+            if not self._fits(vec, remaining):
+                continue
+            chosen.append(i)
+            if self._search(tuple(r - c for r, c in zip(remaining, vec)),
+                            chosen):
+                found = True
+            chosen.pop()
+            if len(self._phrases) >= self._max_results:
+                return True
+
+        if not found:
+            self._dead_ends.add(remaining)
+        return found
+
+    def _add_phrases(self, chosen):
+        """
+        Add every phrase made by picking one word from each chosen group.
+        """
+        # The same set of groups can be reached in a different order
+        key = tuple(sorted(chosen))
+        if key in self._seen:
+            return
+        self._seen.add(key)
+
+        groups = [self.groups[self.candidates[i]] for i in key]
+        seen_words = set()
+        for words in product(*groups):
+            # Skip repeats when a group is picked more than once
+            if len(key) != len(set(key)):
+                sorted_words = tuple(sorted(words))
+                if sorted_words in seen_words:
+                    continue
+                seen_words.add(sorted_words)
+            self._phrases.append(" ".join(words))
+            if len(self._phrases) >= self._max_results:
+                return
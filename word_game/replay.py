@@ -0,0 +1,111 @@
+import random
+import sys
+import time
+from anagram_generator import get_anagrams
+from game_session import GameSession
+
+"""
+Load test for the game logic. Feeds streams of guesses through many
+    GameSessions (no curses involved) and reports how many guesses per second
+    were handled, along with per-guess latency percentiles.
+
+Guesses either come from a recorded file (one guess per line, replayed in
+    every session), or are generated: every word to find, shuffled in with
+    repeats, words with bad letters, words that are too small and words that
+    are just wrong.
+"""
+
+USAGE = "Usage: python3 {} <dict file> <chars> <num sessions> [guess file]"
+
+# Same as the default on the settings screen
+MIN_CHARS = 4
+
+
+def synthetic_guesses(chars, min_chars, words, rng):
+    """
+    Return a shuffled list of guesses that includes every word in words (so
+        the session is won), plus a mix of guesses that get each of the
+        other responses.
+    """
+    guesses = list(words)
+    bad_letter = next((c for c in "zqxjkvwy" if c not in chars), "")
+    for word in words:
+        guesses.append(word)                       # repeat
+        guesses.append(word + bad_letter)          # bad letters
+    for _ in range(len(words)):
+        guesses.append(chars[0] * max(min_chars-1, 0))  # too small
+        guesses.append("".join(rng.choice(chars) for _ in range(min_chars+2)))
+    rng.shuffle(guesses)
+    return guesses
+
+
+def replay(sessions, chars, min_chars, words, guess_file=None, seed=0):
+    """
+    Play sessions games and return a list of how long each guess took to
+        check, in nanoseconds.
+    """
+    recorded = None
+    if guess_file:
+        try:
+            with open(guess_file) as f:
+                recorded = [line.strip() for line in f if line.strip()]
+        except IOError:
+            sys.exit("Error: could not open file '{}'.".format(guess_file))
+
+    rng = random.Random(seed)
+    timer = time.perf_counter_ns
+    latencies = list()
+    for _ in range(sessions):
+        session = GameSession(chars, min_chars, words)
+        if recorded is not None:
+            guesses = recorded
+        else:
+            guesses = synthetic_guesses(chars, min_chars, words, rng)
+        for guess in guesses:
+            start = timer()
+            session.submit_guess(guess)
+            latencies.append(timer() - start)
+            if session.is_won():
+                break
+    return latencies
+
+
+def percentile(sorted_values, pct):
+    """
+    Return the value at the given percentile of an already sorted list.
+    """
+    i = min(len(sorted_values)-1, int(len(sorted_values) * pct / 100))
+    return sorted_values[i]
+
+
+def main():
+    if len(sys.argv) not in (4, 5) or not sys.argv[3].isdigit():
+        sys.exit(USAGE.format(sys.argv[0]))
+
+    dict_file, chars, sessions = sys.argv[1], sys.argv[2], int(sys.argv[3])
+    guess_file = sys.argv[4] if len(sys.argv) == 5 else None
+
+    words = get_anagrams(dict_file, chars, MIN_CHARS)
+    if not words:
+        sys.exit("Couldn't find any words in the dictionary with size >= {}"
+                " consisting of the letters '{}'.".format(MIN_CHARS, chars))
+
+    start = time.perf_counter()
+    latencies = replay(sessions, chars, MIN_CHARS, words, guess_file)
+    elapsed = time.perf_counter() - start
+    if not latencies:
+        sys.exit("No guesses were made.")
+
+    latencies.sort()
+    print("{} sessions, {} words each, {} guesses in {:.3f}s"\
+            .format(sessions, len(words), len(latencies), elapsed))
+    # Throughput counts only time spent checking guesses, not making them up
+    print("{:.0f} guesses/sec".format(len(latencies) / (sum(latencies) / 1e9)))
+    print("per-guess latency: p50 {:.1f}us, p99 {:.1f}us, max {:.1f}us"\
+            .format(percentile(latencies, 50) / 1000,
+                    percentile(latencies, 99) / 1000,
+                    latencies[-1] / 1000))
+
+
+if __name__ == "__main__":
+    main()
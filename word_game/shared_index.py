@@ -0,0 +1,299 @@
+import _posixshmem
+import atexit
+import fcntl
+import hashlib
+import mmap
+import os
+import signal
+import struct
+import sys
+import tempfile
+from multiprocessing import resource_tracker, shared_memory
+from anagram_index import AnagramIndex
+from dict_loader import WordStore, cache_key
+
+"""
+Lets every word_game process on a machine share one copy of a dictionary's
+    index, instead of each loading its own.
+
+The first process to attach publishes the WordStore and AnagramIndex arrays
+    into a multiprocessing.shared_memory segment, named after the dictionary
+    file's path, size and mtime. Later processes find the segment by that name
+    and use the arrays in it directly through memoryviews, without copying or
+    parsing anything.
+
+The segment is reference counted with a lock file in the temp directory
+    that lists the pids using it. Attaching and detaching happen with the lock file locked,
+    pids of processes that died without detaching are cleaned out, and the
+    last process to detach removes the segment. Detaching happens at exit,
+    including on SIGHUP (e.g. an SSH session closing) and SIGTERM.
+
+Games may be run by different users (e.g. one per SSH login). Everyone can
+    read the segment, but only the process that published it can write to
+    it: the rest map it read-only, so no user can change what another
+    user's game sees. The lock file has to be writable by everyone, so the
+    worst another user can do with it is get the segment removed early
+    (games already using it keep their mapping) or left behind. Only its
+    owner can remove the segment (/dev/shm is sticky), so if the last game
+    to detach belongs to someone else, it's left for the next game to reuse.
+"""
+
+# Header: magic, then number of words, blob bytes, ids and mask groups
+HEADER = struct.Struct("<4sIIII")
+MAGIC = b"WGI1"
+
+# File modes for the segment (only the publisher writes to it) and lock file
+#   (every game records itself in it), so every user's games can use them
+SEGMENT_MODE = 0o644
+LOCK_MODE = 0o666
+
+
+class SharedIndex:
+    """
+    A process's handle on a shared index. Use index like any AnagramIndex,
+        and call close() (also done automatically at exit) when done.
+    """
+
+    def __init__(self, name, shm):
+        self.name = name
+        self._shm = shm
+        self._views = list()
+        self.index = _read(shm, self._views)
+        atexit.register(self.close)
+        _exit_on_signals()
+
+    def close(self):
+        """
+        Detach from the segment, removing it if no one else is using it.
+        """
+        if self._shm is None:
+            return
+        self.index = None
+        for view in reversed(self._views):
+            try:
+                view.release()
+            except BufferError:
+                pass    # something still holds a slice; the OS will tidy up
+        try:
+            self._shm.close()
+        except BufferError:
+            pass
+
+        with _locked(self.name) as users:
+            users.discard(os.getpid())
+            if not users:
+                try:
+                    _unlink(self.name)
+                except PermissionError:
+                    pass    # someone else's; the next game will reuse it
+        self._shm = None
+
+
+def segment_name(dict_file):
+    """
+    Return the name of the shared memory segment for the given dictionary
+        file. It changes whenever the file does.
+    """
+    digest = hashlib.sha256(repr(cache_key(dict_file)).encode()).hexdigest()
+    return "word_game_" + digest[:16]
+
+
+def attach(dict_file, build_index):
+    """
+    Return a SharedIndex for the given dictionary file, publishing it first if
+        no other process has. build_index is called with dict_file to get an
+        AnagramIndex to publish, only if there's nothing to attach to yet.
+        Returns None if the shared copy can't be used (e.g. it was published
+        by another user with stricter permissions), in which case the caller
+        should just load its own.
+    """
+    name = segment_name(dict_file)
+    try:
+        with _locked(name) as users:
+            shm = _open(name)
+            if shm is not None and not _complete(shm):
+                # Left behind by a process that died while publishing it
+                shm.close()
+                _unlink(name)
+                shm = None
+            if shm is None:
+                shm = _publish(name, build_index(dict_file))
+            users.add(os.getpid())
+    except OSError:
+        return None
+
+    shared = SharedIndex(name, shm)
+    shared.index.store.key = cache_key(dict_file)
+    return shared
+
+
+def _publish(name, index):
+    """
+    Create the segment and copy the index's arrays into it.
+    """
+    store = index.store
+    arrays = [store.offsets, index.ids, index.group_masks, index.group_starts]
+    blob = bytes(store.blob)
+    size = HEADER.size + sum(len(a) * 4 for a in arrays) + len(blob)
+
+    shm = _shared_memory(name, create=True, size=max(size, 1))
+    os.fchmod(shm._fd, SEGMENT_MODE)
+    pos = HEADER.size
+    for a in arrays:
+        data = a.tobytes()
+        shm.buf[pos:pos+len(data)] = data
+        pos += len(data)
+    shm.buf[pos:pos+len(blob)] = blob
+    # The header goes in last, so a segment only looks valid once it's all
+    #   there
+    HEADER.pack_into(shm.buf, 0, MAGIC, len(store), len(blob),
+                     len(index.ids), len(index.group_masks))
+    return shm
+
+
+def _complete(shm):
+    """
+    Return whether the segment was published in full.
+    """
+    return shm.size >= HEADER.size and \
+        HEADER.unpack_from(shm.buf, 0)[0] == MAGIC
+
+
+def _read(shm, views):
+    """
+    Return an AnagramIndex whose arrays are views into the segment, adding
+        every view made to views so they can be released later.
+    """
+    buf = shm.buf
+    magic, n_words, blob_len, n_ids, n_groups = HEADER.unpack_from(buf, 0)
+    if magic != MAGIC:
+        raise ValueError("not a word_game index segment")
+
+    pos = HEADER.size
+    arrays = list()
+    for count in (n_words + 1, n_ids, n_groups, n_groups + 1):
+        raw = buf[pos:pos + count*4]
+        arr = raw.cast("I")
+        views.extend((raw, arr))
+        arrays.append(arr)
+        pos += count * 4
+    blob = buf[pos:pos + blob_len]
+    views.append(blob)
+
+    offsets, ids, group_masks, group_starts = arrays
+    return AnagramIndex(WordStore(blob, offsets), ids, group_masks,
+                        group_starts)
+
+
+def _shared_memory(name, create=False, size=0):
+    """
+    Open a segment without handing it to multiprocessing's resource tracker,
+        which would otherwise remove it when this process exits even if
+        others are still using it. Lifetime is managed by the pid list.
+    """
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name, create=create, size=size,
+                                          track=False)
+    shm = shared_memory.SharedMemory(name, create=create, size=size)
+    resource_tracker.unregister(shm._name, "shared_memory")
+    return shm
+
+
+class _ReadOnlySegment:
+    """
+    A segment published by another process, mapped read-only. Has the same
+        buf, size and close() as a SharedMemory.
+    """
+
+    def __init__(self, name):
+        fd = _posixshmem.shm_open("/" + name, os.O_RDONLY, mode=0)
+        try:
+            self.size = os.fstat(fd).st_size
+            # An empty one can't be mapped (it'll fail _complete() anyway)
+            self._mmap = mmap.mmap(fd, self.size, prot=mmap.PROT_READ) \
+                if self.size else None
+        finally:
+            os.close(fd)
+        self.buf = memoryview(self._mmap if self._mmap else b"")
+
+    def close(self):
+        self.buf.release()
+        if self._mmap is not None:
+            self._mmap.close()
+
+
+def _open(name):
+    try:
+        return _ReadOnlySegment(name)
+    except FileNotFoundError:
+        return None
+
+
+def _unlink(name):
+    try:
+        _posixshmem.shm_unlink("/" + name)
+    except FileNotFoundError:
+        pass
+
+
+def _exit_on_signals():
+    """
+    Make SIGHUP and SIGTERM exit through SystemExit, so atexit handlers (and
+        so SharedIndex.close()) still run. Signals that already have a
+        handler are left alone.
+    """
+    for sig in (signal.SIGHUP, signal.SIGTERM):
+        try:
+            if signal.getsignal(sig) == signal.SIG_DFL:
+                signal.signal(sig, _raise_exit)
+        except ValueError:
+            return  # not the main thread, so can't set handlers
+
+
+def _raise_exit(signum, frame):
+    sys.exit(128 + signum)
+
+
+def _lock_path(name):
+    return os.path.join(tempfile.gettempdir(), name + ".lock")
+
+
+class _locked:
+    """
+    Context manager holding an exclusive lock on a segment's lock file.
+        Gives the set of pids using the segment (minus any that have died),
+        and writes it back afterwards.
+    """
+
+    def __init__(self, name):
+        self.path = _lock_path(name)
+
+    def __enter__(self):
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, LOCK_MODE)
+        if os.fstat(fd).st_uid == os.geteuid():
+            os.fchmod(fd, LOCK_MODE)    # the umask may have taken some away
+        self.f = os.fdopen(fd, "r+")
+        fcntl.flock(self.f, fcntl.LOCK_EX)
+        self.f.seek(0)
+        self.users = set(int(p) for p in self.f.read().split() if p.isdigit())
+        self.users = set(p for p in self.users if _alive(p))
+        return self.users
+
+    def __exit__(self, *exc):
+        self.f.seek(0)
+        self.f.truncate()
+        self.f.write("\n".join(str(p) for p in sorted(self.users)))
+        self.f.flush()
+        fcntl.flock(self.f, fcntl.LOCK_UN)
+        self.f.close()
+        return False
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass    # exists, but belongs to someone else
+    return True
@@ -0,0 +1,87 @@
+import os
+import subprocess
+import sys
+import unittest
+
+"""
+Start-up budget for the command line tools. anagram_generator gets run
+    thousands of times by scripts, so the fixed cost of importing it adds up.
+
+Each check runs a fresh interpreter with -X importtime and reads how long
+    the import took (in microseconds) from its report. Run with
+    "python3 -m unittest test_startup" (or pytest) from this directory.
+"""
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Import time budgets, in microseconds. These are a few times what the
+#   imports take on an ordinary machine, to leave room for slow ones
+ANAGRAM_GENERATOR_BUDGET = 25000
+WORD_GAME_BUDGET = 35000
+
+# Modules that are only needed on some paths, so shouldn't be imported up
+#   front
+LAZY_MODULES = ("json", "re", "fnmatch", "hashlib", "random", "string")
+
+
+def import_times(args, runs=3):
+    """
+    Run python3 -X importtime with args, and return {module: cumulative
+        microseconds} for every module imported, taking the fastest of
+        several runs. Modules imported by other modules are indented as in
+        the report.
+    """
+    env = dict(os.environ)
+    env.pop("PYTHONDONTWRITEBYTECODE", None)    # time it with .pyc files
+    command = [sys.executable, "-X", "importtime"] + args
+    subprocess.run(command, cwd=HERE, env=env, capture_output=True)
+
+    best = dict()
+    for i in range(runs):
+        result = subprocess.run(command, cwd=HERE, env=env,
+                                capture_output=True, text=True)
+        times = dict()
+        for line in result.stderr.splitlines():
+            if not line.startswith("import time:") or "|" not in line:
+                continue
+            self_us, cumulative, name = line[12:].split("|")
+            if not cumulative.strip().isdigit():
+                continue    # the header line
+            times[name[1:].rstrip()] = int(cumulative)
+        for name, t in times.items():
+            best[name] = min(t, best.get(name, t))
+    return best
+
+
+def imported(times):
+    """
+    Return the names of every module in the import_times() result, without
+        the indentation showing what imported them.
+    """
+    return set(name.strip() for name in times)
+
+
+class StartupTest(unittest.TestCase):
+
+    def test_anagram_generator_import(self):
+        times = import_times(["-c", "import anagram_generator"])
+        self.assertLess(times["anagram_generator"],
+                        ANAGRAM_GENERATOR_BUDGET)
+        for module in LAZY_MODULES:
+            self.assertNotIn(module, imported(times))
+
+    def test_word_game_import(self):
+        times = import_times(["-c", "import word_game"])
+        self.assertLess(times["word_game"], WORD_GAME_BUDGET)
+        for module in LAZY_MODULES:
+            self.assertNotIn(module, imported(times))
+
+    def test_word_game_bad_args(self):
+        # Getting the arguments wrong should exit before loading the game
+        times = import_times(["word_game.py"])
+        for module in ("curses", "word_game_lib", "anagram_generator"):
+            self.assertNotIn(module, imported(times))
+
+
+if __name__ == "__main__":
+    unittest.main()
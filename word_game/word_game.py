@@ -1,11 +1,5 @@
 import sys
 import os
-import curses
-import json
-from curses import wrapper, ascii
-from anagram_generator import get_anagrams, load_json_dict
-
-from word_game_lib import *
 
 """
 This is a word-guessing game, where you must guess all of the words that can be
@@ -14,8 +8,13 @@ This is a word-guessing game, where you must guess all of the words that can be
 """
 
 
-def main(stdscr):
-    if len(sys.argv) != 2:
+def _check_args():
+    """
+    Exit with instructions if the arguments are wrong, before curses takes
+        over the terminal. Return a tuple of (dict file, shared).
+    """
+    shared = len(sys.argv) == 3 and sys.argv[2] == "--shared"
+    if len(sys.argv) != 2 and not shared:
         sys.exit("\n\nHi! Thanks for trying my game.\n"
                  "This is a word guessing game, where you're given a "
                  "list of letters you must use to make words, as well as "
@@ -24,24 +23,45 @@ def main(stdscr):
                  "minimum word length.\n\n"
                  "In order to play it, you need a dictionary file in "
                  "json format. Run as follows:\n"
-                 "  'python3 {} <json dictionary>'\n\n".format(sys.argv[0]))
+                 "  'python3 {} <json dictionary>'\n\n"
+                 "If you're running lots of games on one machine, add "
+                 "--shared to the end so they all share one copy of the "
+                 "dictionary.\n\n".format(sys.argv[0]))
+    return (sys.argv[1], shared)
+
+
+# Check the arguments before importing curses and the rest, so getting them
+#   wrong exits straight away
+if __name__ == "__main__":
+    filename, shared = _check_args()
 
+import curses
+from curses import wrapper, ascii
+from anagram_generator import get_anagrams, get_index, use_index
+from dict_loader import load_words
+from game_session import GameSession, GOOD
+
+from word_game_lib import *
+
+
+def main(stdscr, filename, shared):
     # Make sure terminal is big enough (curses is fussy)
     term_size = os.get_terminal_size()
     if term_size[0] < 42 or term_size[1] < 24:
         sys.exit("Error: I'm feeling a little claustrophobic...\n"
               "Curses needs a bigger terminal window to display properly.\n")
 
-    filename = sys.argv[1]
-    try:
-        with open(filename) as f:
-            jd = set(json.loads(f.read()))
-            if not jd:
-                sys.exit("Error: '{}' is not a valid dictionary."\
-                            .format(filename))
-    except IOError:
-        sys.exit("Error: could not open (or perhaps find) file '{}'."\
-                    .format(filename))
+    # Check the dictionary before showing settings (this also warms the cache)
+    shared_dict = None
+    if shared:
+        # Use the copy other games on this machine have already loaded, or
+        #   load it and share it with them
+        import shared_index
+        shared_dict = shared_index.attach(filename, get_index)
+    if shared_dict is not None:
+        use_index(filename, shared_dict.index)
+    else:
+        load_words(filename)    # no (usable) shared copy, so load our own
 
 
     # Set up window lookin' nice (curses)
@@ -58,9 +78,8 @@ def main(stdscr):
     # Show something instead of hanging while getting words
     stdscr.addstr(3, 1, "Loading...")
     stdscr.refresh()
-    words = get_anagrams(filename, chars)
-    # Take out any words that are shorter than min chars
-    words = [word for word in words if len(word) >= min_chars]
+    # Leaves out any words that are shorter than min chars
+    words = get_anagrams(filename, chars, min_chars)
 
     if not words:
         sys.exit("Couldn't find any words in the dictionary with size >= {}"
@@ -201,8 +220,9 @@ def _settings(stdscr):
     return (letters, int(min_word_size_sel.get_selection_val()))
 
 def _game(stdscr, chars, min_chars, words):
-    require_char = chars[0]
-    chars = ''.join(sorted(list(set(chars))))
+    session = GameSession(chars, min_chars, words)
+    require_char = session.require_char
+    chars = session.chars
 
     #TEST
     #stdscr.addstr(3, curses.COLS//4, "|")
@@ -260,22 +280,20 @@ def _game(stdscr, chars, min_chars, words):
     print_right_align(stdscr, curses.LINES-1, curses.COLS-2,\
             "Min word size: {}".format(min_chars))
 
-    found_words = list()
     guess = True
     user_input = ""
     while True:
         # Game loop: 
         if guess:
             # Update user's progress
-            stdscr.addstr(progress_y, progress_x,\
-                "Found {} of {} words".format(len(found_words), len(words)))
+            stdscr.addstr(progress_y, progress_x, session.progress())
             # Update found words box
             fill_rect(stdscr, found_words_box_y+1, found_words_box_x+1,\
                        found_words_box_h-2, found_words_box_w-2,\
                        curses.ascii.SP)
             print_in_rect(stdscr, found_words_box_y+1, found_words_box_x+1,\
                            found_words_box_h-2, found_words_box_w-2,\
-                           found_words)
+                           session.found_words)
             stdscr.refresh()
             guess = False
 
@@ -292,34 +310,18 @@ def _game(stdscr, chars, min_chars, words):
                 user_input_field.draw(stdscr)
                 stdscr.refresh()
 
-        # Check if user used bad letters
-        bad_letters = set([x for x in user_input if x not in chars])
-
         def display_message(message):
             print_right_align(stdscr, message_y, message_x, " " * message_w)
             print_right_align(stdscr, message_y, message_x, message)
             stdscr.refresh()
 
         # Check if we recognize that word and display a message to the user
-        if user_input in words and user_input not in found_words:
-            found_words.append(user_input)
-            found_words.sort()
-            display_message("Good job!")
+        result, message = session.submit_guess(user_input)
+        display_message(message)
+        if result == GOOD:
             guess = True
-        elif user_input in found_words:
-            display_message("You already got that one!")
-        elif bad_letters:
-            display_message("Bad letters: {}".format("".join(bad_letters)))
-        elif len(user_input) < min_chars:
-            display_message("That word was too small.")
-        elif not require_char in user_input:
-            display_message("'{}' must appear in every word."\
-                                .format(require_char))
-        else:
-            display_message("Wrong: {}".format(user_input))
-
 
-        if len(found_words) == len(words):
+        if session.is_won():
             # User wins!
             break
 
@@ -334,7 +336,8 @@ def _game(stdscr, chars, min_chars, words):
     fill_rect(stdscr, win_msg_y-1, win_msg_x-1, win_msg_h+2, win_msg_w+2,
               curses.ascii.SP)
     draw_box(stdscr, win_msg_y, win_msg_x, win_msg_h, win_msg_w)
-    stdscr.addstr(win_msg_y+1, win_msg_x+1, win_msg_str1.format(len(found_words)))
+    stdscr.addstr(win_msg_y+1, win_msg_x+1,
+                  win_msg_str1.format(len(session.found_words)))
     stdscr.addstr(win_msg_y+3, win_msg_x+1, win_msg_str2)
     while True:
         if stdscr.getch():
@@ -342,5 +345,5 @@ def _game(stdscr, chars, min_chars, words):
 
 if __name__ == "__main__":
     # Curses wrapper to make things a little easier on myself
-    wrapper(main)
+    wrapper(main, filename, shared)
 
@@ -1,7 +1,5 @@
 import curses
 from curses import ascii
-import string   # string and random for generating random chars
-import random
 
 class OptionBox:
     """
@@ -355,6 +353,10 @@ def gen_chars(how_many):
     Return a string of some random non-repeating characters, always with
         at least one vowel.
     """
+    # Only needed once per game, so don't make every start up pay for them
+    import string
+    import random
+
     val = random.sample(string.ascii_lowercase, how_many)
     vowels = "aeiouy"
     if not any(c in val for c in vowels):